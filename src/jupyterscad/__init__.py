@@ -15,7 +15,21 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
-from ._render import render_stl
+from ._render import (
+    HTTPExecutor,
+    LocalExecutor,
+    RenderExecutor,
+    render_stl,
+    render_stls,
+)
 from ._view import view, view_stl
 
-__all__ = ["render_stl", "view", "view_stl"]
+__all__ = [
+    "HTTPExecutor",
+    "LocalExecutor",
+    "RenderExecutor",
+    "render_stl",
+    "render_stls",
+    "view",
+    "view_stl",
+]
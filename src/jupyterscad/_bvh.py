@@ -0,0 +1,285 @@
+"""
+Jupyter SCAD
+Copyright (C) 2023 Jennifer Reiber Kyle
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+EPSILON = 1e-9
+
+
+class BVH:
+    """Bounding volume hierarchy over the triangles of a mesh.
+
+    The tree is stored in flat NumPy arrays. Interior nodes reference their
+    two children, leaf nodes reference a contiguous range of `order`, the
+    permutation of triangle indices sorted into leaf order.
+
+    Args:
+        triangles: Triangle vertices with shape (n, 3, 3).
+        leaf_size: Maximum number of triangles in a leaf node.
+    """
+
+    def __init__(self, triangles: np.ndarray, leaf_size: int = 8):
+        self.triangles = np.asarray(triangles, dtype=np.float64)
+        self.leaf_size = leaf_size
+        self._build()
+
+    def _build(self):
+        num_triangles = len(self.triangles)
+        order = np.arange(num_triangles)
+        # centroid coordinates, one row per axis, kept in the same order as order
+        centroids = np.ascontiguousarray(self.triangles.mean(axis=1).T)
+
+        # a binary tree with leaves of at least one triangle has < 2n nodes
+        max_nodes = max(2 * num_triangles - 1, 1)
+        children = np.full((max_nodes, 2), -1, dtype=np.int64)
+        start = np.zeros(max_nodes, dtype=np.int64)
+        count = np.zeros(max_nodes, dtype=np.int64)
+
+        # split one level at a time, processing all nodes of a level together;
+        # the triangles of a node are the contiguous range lo:hi of order
+        num_nodes = 1
+        nodes = np.array([0])
+        lo = np.array([0])
+        hi = np.array([num_triangles])
+        interior_levels = []
+        while len(nodes):
+            leaf = hi - lo <= self.leaf_size
+            start[nodes[leaf]] = lo[leaf]
+            count[nodes[leaf]] = (hi - lo)[leaf]
+
+            nodes, lo, hi = nodes[~leaf], lo[~leaf], hi[~leaf]
+            if not len(nodes):
+                break
+            interior_levels.append(nodes)
+
+            # the ranges are usually adjacent, then a slice avoids a gather
+            if np.array_equal(lo[1:], hi[:-1]):
+                pos = slice(lo[0], hi[-1])
+                offsets = lo - lo[0]
+            else:
+                pos, offsets = _positions(lo, hi)
+            c = centroids[:, pos]
+
+            # median split along the longest axis of the centroid bounds
+            c_min = np.minimum.reduceat(c, offsets, axis=1)
+            c_extent = np.maximum.reduceat(c, offsets, axis=1) - c_min
+            axis = np.argmax(c_extent, axis=0)
+
+            # sort by node, then by relative position along the node's split axis
+            node_of = np.repeat(np.arange(len(nodes)), hi - lo)
+            node_index = np.arange(len(nodes))
+            extent = c_extent[axis, node_index]
+            scale = 2 * np.where(extent > 0, extent, 1)
+            key = (
+                np.choose(axis[node_of], c) - c_min[axis, node_index][node_of]
+            ) / scale[node_of]
+            perm = np.argsort(node_of + key)
+            order[pos] = order[pos][perm]
+            for a in range(3):
+                centroids[a, pos] = c[a][perm]
+
+            mid = lo + (hi - lo) // 2
+            left = num_nodes + 2 * np.arange(len(nodes))
+            num_nodes += 2 * len(nodes)
+            children[nodes, 0] = left
+            children[nodes, 1] = left + 1
+
+            nodes = np.stack([left, left + 1], axis=1).ravel()
+            lo, hi = np.stack([lo, mid, mid, hi], axis=1).reshape(-1, 2).T
+
+        children = children[:num_nodes]
+        start = start[:num_nodes]
+        count = count[:num_nodes]
+
+        # leaf bounds from their triangles, then parent bounds bottom up
+        bounds_min = np.zeros((num_nodes, 3))
+        bounds_max = np.zeros((num_nodes, 3))
+        leaves = np.flatnonzero(count)
+        if len(leaves):
+            leaves = leaves[np.argsort(start[leaves])]
+            v0, v1, v2 = self.triangles[order].transpose(1, 0, 2)
+            tri_min = np.minimum(np.minimum(v0, v1), v2)
+            tri_max = np.maximum(np.maximum(v0, v1), v2)
+            bounds_min[leaves] = np.minimum.reduceat(tri_min, start[leaves])
+            bounds_max[leaves] = np.maximum.reduceat(tri_max, start[leaves])
+        for nodes in reversed(interior_levels):
+            left, right = children[nodes].T
+            bounds_min[nodes] = np.minimum(bounds_min[left], bounds_min[right])
+            bounds_max[nodes] = np.maximum(bounds_max[left], bounds_max[right])
+
+        self.order = order
+        self.bounds_min = bounds_min
+        self.bounds_max = bounds_max
+        self.children = children
+        self.start = start
+        self.count = count
+
+    def _leaf_triangles(self, node: int) -> np.ndarray:
+        return self.order[self.start[node] : self.start[node] + self.count[node]]
+
+    def intersect_ray(
+        self, origin, direction
+    ) -> Optional[Tuple[float, int, np.ndarray]]:
+        """Find the closest triangle hit by a ray.
+
+        Args:
+            origin: Ray origin.
+            direction: Ray direction, need not be normalized.
+
+        Returns:
+            Ray parameter, triangle index and point of the closest hit, or None
+            if the ray misses the mesh.
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            inv_dir = 1 / direction
+
+        best_t = np.inf
+        best_tri = -1
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            t_near = _slab_test(
+                origin, inv_dir, self.bounds_min[node], self.bounds_max[node]
+            )
+            if t_near is None or t_near > best_t:
+                continue
+
+            left, right = self.children[node]
+            if left < 0:
+                tris = self._leaf_triangles(node)
+                if not len(tris):
+                    continue
+                t = _intersect_triangles(origin, direction, self.triangles[tris])
+                i = np.argmin(t)
+                if t[i] < best_t:
+                    best_t = t[i]
+                    best_tri = tris[i]
+            else:
+                stack.append(right)
+                stack.append(left)
+
+        if best_tri < 0:
+            return None
+        return float(best_t), int(best_tri), origin + best_t * direction
+
+    def cross_section(self, origin, normal) -> np.ndarray:
+        """Intersect the mesh with a plane.
+
+        Args:
+            origin: A point on the plane.
+            normal: Plane normal, need not be normalized.
+
+        Returns:
+            Line segments of the section with shape (k, 2, 3).
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        normal = np.asarray(normal, dtype=np.float64)
+        offset = normal @ origin
+
+        segments = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+
+            # signed distance of the box center and the box projected extent
+            center = (self.bounds_min[node] + self.bounds_max[node]) / 2
+            extent = (self.bounds_max[node] - self.bounds_min[node]) / 2
+            if abs(normal @ center - offset) > np.abs(normal) @ extent:
+                continue
+
+            left, right = self.children[node]
+            if left < 0:
+                tris = self.triangles[self._leaf_triangles(node)]
+                segments.append(_section_triangles(tris, normal, offset))
+            else:
+                stack.append(right)
+                stack.append(left)
+
+        if not segments:
+            return np.empty((0, 2, 3))
+        return np.concatenate(segments)
+
+
+def _positions(lo, hi) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenated index ranges lo:hi and the offset of each range in it"""
+    lengths = hi - lo
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets - lo, lengths), offsets
+
+
+def _slab_test(origin, inv_dir, box_min, box_max) -> Optional[float]:
+    """Entry ray parameter of a ray and an axis-aligned box, None on a miss"""
+    with np.errstate(invalid="ignore"):
+        t0 = (box_min - origin) * inv_dir
+        t1 = (box_max - origin) * inv_dir
+    # nan arises for a ray parallel to and on a slab boundary, treat as inside
+    t_near = np.nanmax(np.append(np.minimum(t0, t1), 0))
+    t_far = np.nanmin(np.append(np.maximum(t0, t1), np.inf))
+    if t_near > t_far:
+        return None
+    return t_near
+
+
+def _intersect_triangles(origin, direction, triangles) -> np.ndarray:
+    """Ray parameter of the hit with each triangle (Moller-Trumbore), inf on miss"""
+    v0, v1, v2 = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    e1 = v1 - v0
+    e2 = v2 - v0
+    p = np.cross(direction, e2)
+    det = np.einsum("ij,ij->i", e1, p)
+
+    valid = np.abs(det) > EPSILON
+    inv_det = np.where(valid, 1 / np.where(valid, det, 1), 0)
+
+    s = origin - v0
+    u = np.einsum("ij,ij->i", s, p) * inv_det
+    q = np.cross(s, e1)
+    v = (q @ direction) * inv_det
+    t = np.einsum("ij,ij->i", e2, q) * inv_det
+
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+def _section_triangles(triangles, normal, offset) -> np.ndarray:
+    """Line segments where triangles cross the plane normal . x = offset"""
+    d = triangles @ normal - offset
+    side = d > 0
+
+    # triangles with vertices on both sides, one vertex alone on its side
+    crossing = side.any(axis=1) & ~side.all(axis=1)
+    triangles = triangles[crossing]
+    d = d[crossing]
+    side = side[crossing]
+
+    alone = np.where(side.sum(axis=1) == 1, side.argmax(axis=1), side.argmin(axis=1))
+    rows = np.arange(len(triangles))
+
+    segments = np.empty((len(triangles), 2, 3))
+    for k, step in enumerate((1, 2)):
+        other = (alone + step) % 3
+        da = d[rows, alone]
+        db = d[rows, other]
+        t = (da / (da - db))[:, np.newaxis]
+        a = triangles[rows, alone]
+        b = triangles[rows, other]
+        segments[:, k] = a + t * (b - a)
+    return segments
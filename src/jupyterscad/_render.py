@@ -15,23 +15,36 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
+import base64
+import http.client
+import json
 import logging
+import select
 import subprocess
 import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
 from os import PathLike
 from pathlib import Path
 from shutil import which
-from typing import Optional, Union
+from typing import Iterable, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
 
-from .exceptions import OpenSCADError, RenderError
+from ._serialize import write_scad
+from .exceptions import OpenSCADError, RenderError, WorkerError
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_WORKER_TIMEOUT = 600
+
 
 def render_stl(
     obj,
     outfile: Union[str, PathLike],
     openscad_exec: Optional[Union[str, PathLike]] = None,
+    executor: Optional["RenderExecutor"] = None,
+    hoist: bool = True,
 ):
     """Render a stl from an OpenSCAD object.
 
@@ -42,16 +55,223 @@ def render_stl(
     Args:
         obj: OpenSCAD object to visualize.
         outfile: Name of stl file to generate. No stl file is generated if None.
-        openscad_exec: Path to openscad executable.
+        openscad_exec: Path to openscad executable. Ignored if executor is given.
+        executor: Executor that runs the render. Defaults to a LocalExecutor.
+        hoist: Write repeated subtrees of SolidPython2 objects once as OpenSCAD
+            modules. If False, the scad source is the same as str(obj).
+
+    Raises:
+        exceptions.OpenSCADException: An error occurred running OpenSCAD.
+    """
+    render_stls(
+        [obj], [outfile], openscad_exec=openscad_exec, executor=executor, hoist=hoist
+    )
+
+
+def render_stls(
+    objs: Sequence,
+    outfiles: Sequence[Union[str, PathLike]],
+    openscad_exec: Optional[Union[str, PathLike]] = None,
+    executor: Optional["RenderExecutor"] = None,
+    hoist: bool = True,
+):
+    """Render stls from OpenSCAD objects in one batch.
+
+    Typical usage example:
+
+        >>> render_stls([cube(3), sphere(2)], ['cube.stl', 'sphere.stl'])
+
+    Args:
+        objs: OpenSCAD objects to render.
+        outfiles: Names of stl files to generate, one per object.
+        openscad_exec: Path to openscad executable. Ignored if executor is given.
+        executor: Executor that runs the renders. Defaults to a LocalExecutor.
+        hoist: Write repeated subtrees of SolidPython2 objects once as OpenSCAD
+            modules. If False, the scad source is the same as str(obj).
 
     Raises:
         exceptions.OpenSCADException: An error occurred running OpenSCAD.
     """
-    with tempfile.NamedTemporaryFile(suffix=".scad", dir=".") as scad_tmp_file:
-        with open(scad_tmp_file.name, "w") as fp:
-            fp.write(str(obj))
+    if len(objs) != len(outfiles):
+        raise ValueError("objs and outfiles must have the same length.")
+
+    executor = executor or LocalExecutor(openscad_exec)
+
+    with ExitStack() as stack:
+        jobs = []
+        for obj, outfile in zip(objs, outfiles):
+            scad_tmp_file = stack.enter_context(
+                tempfile.NamedTemporaryFile(suffix=".scad", dir=".")
+            )
+            with open(scad_tmp_file.name, "w") as fp:
+                write_scad(obj, fp, hoist=hoist)
+            jobs.append((scad_tmp_file.name, outfile))
+
+        executor.render_many(jobs)
+
+
+class RenderExecutor(ABC):
+    """Runs OpenSCAD to render scad files."""
+
+    @abstractmethod
+    def render(self, scad_file, output_file):
+        """Render a scad file to an output file, format given by its suffix"""
+
+    def render_many(self, jobs: Iterable[Tuple[Union[str, PathLike], ...]]):
+        """Render (scad_file, output_file) pairs"""
+        for scad_file, output_file in jobs:
+            self.render(scad_file, output_file)
+
+
+class LocalExecutor(RenderExecutor):
+    """Renders with an OpenSCAD executable on this host.
+
+    Args:
+        openscad_exec: Path to openscad executable, autodetected if None.
+    """
+
+    def __init__(self, openscad_exec: Optional[Union[str, PathLike]] = None):
+        self.openscad_exec = openscad_exec
+
+    def render(self, scad_file, output_file):
+        process(scad_file, output_file, executable=self.openscad_exec)
+
+
+class HTTPExecutor(RenderExecutor):
+    """Renders on a remote worker over HTTP.
+
+    The scad text is sent to the worker and the rendered mesh is sent back, so
+    files the scad source refers to, e.g. imported stls, must be available to
+    the worker. Relative paths resolve against the worker's root directory,
+    not the notebook's directory. One connection is kept open and reused for
+    all renders and `render_many` sends all jobs in a single request.
+
+    See `jupyterscad.worker` for a reference worker server.
+
+    Args:
+        url: Worker base url, e.g. 'http://localhost:8731'.
+        timeout: Seconds to wait for the worker, covering the whole render of
+            a batch. None waits forever, so a hung worker blocks the caller.
+    """
+
+    def __init__(self, url: str, timeout: Optional[float] = DEFAULT_WORKER_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported worker url {url}.")
+
+        self.url = url
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = parts.path.rstrip("/")
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+
+    def render(self, scad_file, output_file):
+        self.render_many([(scad_file, output_file)])
+
+    def render_many(self, jobs):
+        jobs = list(jobs)
+        body = {
+            "jobs": [
+                {"scad": Path(scad_file).read_text(), "format": _format(output_file)}
+                for scad_file, output_file in jobs
+            ]
+        }
+        try:
+            results = self._request("/render", body)["results"]
+        except (KeyError, TypeError):
+            raise WorkerError("Worker response has no results.")
+
+        if not isinstance(results, list):
+            raise WorkerError("Worker results are not a list.")
+        if len(results) != len(jobs):
+            raise WorkerError(
+                f"Worker returned {len(results)} results for {len(jobs)} jobs."
+            )
+
+        # write every successful render before reporting the first failure
+        error = None
+        for (_, output_file), result in zip(jobs, results):
+            try:
+                if "error" in result:
+                    error = error or _error_from_result(result["error"])
+                else:
+                    data = base64.b64decode(result["data"])
+                    Path(output_file).write_bytes(data)
+            except (KeyError, TypeError, ValueError) as e:
+                error = error or WorkerError(f"Invalid worker result: {e!r}")
+
+        if error:
+            raise error
+
+    def close(self):
+        """Close the connection to the worker"""
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(self._netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+
+    def _request(self, path: str, body: dict) -> dict:
+        data = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+
+        with self._lock:
+            # a kept-alive connection the worker has closed reads as ready
+            if self._conn is not None and _is_closed(self._conn):
+                self._conn.close()
+                self._conn = None
+
+            reused = self._conn is not None
+            if self._conn is None:
+                self._conn = self._connect()
+
+            try:
+                try:
+                    self._conn.request("POST", self._path + path, data, headers)
+                except (http.client.HTTPException, ConnectionError):
+                    if not reused:
+                        raise
+                    # nothing reached the worker, so resending is safe
+                    self._conn.close()
+                    self._conn = self._connect()
+                    self._conn.request("POST", self._path + path, data, headers)
+
+                resp = self._conn.getresponse()
+                payload = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                self._conn.close()
+                self._conn = None
+                raise WorkerError(f"Worker request failed: {e!r}")
+
+        if resp.status != 200:
+            raise WorkerError(f"Worker responded {resp.status}: {payload!r}")
+        try:
+            return json.loads(payload)
+        except ValueError:
+            raise WorkerError(f"Worker response is not JSON: {payload[:200]!r}")
+
+
+def _is_closed(conn: http.client.HTTPConnection) -> bool:
+    if conn.sock is None:
+        return False
+    readable, _, _ = select.select([conn.sock], [], [], 0)
+    return bool(readable)
+
+
+def _format(output_file) -> str:
+    return Path(output_file).suffix.lstrip(".") or "stl"
+
 
-        process(scad_tmp_file.name, outfile, executable=openscad_exec)
+def _error_from_result(error: dict) -> Exception:
+    if error.get("type") == "RenderError":
+        return RenderError(message=error["message"], src=error["src"])
+    return OpenSCADError(error["message"])
 
 
 def process(scad_file, output_file, executable: Optional[Union[str, PathLike]] = None):
@@ -0,0 +1,273 @@
+"""
+Jupyter SCAD
+Copyright (C) 2023 Jennifer Reiber Kyle
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import textwrap
+from typing import IO, Dict, List, Set, Tuple
+
+MODULE_PREFIX = "jupyterscad_subtree_"
+
+# OpenSCAD modules are lexically scoped, so subtrees that may refer to
+# variables bound in their enclosing blocks cannot be moved into a module.
+# Children of these nodes may refer to variables the node binds.
+SCOPE_NODES = frozenset(["for", "intersection_for", "let", "assign", "each"])
+
+# kinds of subtree node
+_NODE = 0  # named node, text is the node head e.g. 'translate(v = [1, 0, 0])'
+_GROUP = 1  # unnamed container, children are emitted as siblings
+_OPAQUE = 2  # node with custom rendering, text is the full rendered scad
+
+
+def write_scad(obj, fp: IO[str], hoist: bool = True, min_hoist_size: int = 2):
+    """Write the OpenSCAD source of an object to a text file object.
+
+    SolidPython2 objects are written node by node without building the whole
+    source in memory. Structurally identical subtrees are detected by hashing
+    and, if hoist is True, written once as an OpenSCAD module and instanced
+    wherever they occur. Other objects are written as str(obj).
+
+    Args:
+        obj: OpenSCAD object, e.g. a SolidPython2 object or scad string.
+        fp: Text file object to write to.
+        hoist: Move repeated subtrees into modules.
+        min_hoist_size: Minimum number of nodes in a hoisted subtree.
+    """
+    try:
+        from solid2.core.builtins.convenience import _ModifierBase
+        from solid2.core.extension_manager import default_extension_manager
+        from solid2.core.object_base import (
+            BareOpenSCADObject,
+            ObjectBase,
+            OpenSCADConstant,
+        )
+        from solid2.core.scad_render import get_include_string
+    except ImportError:
+        fp.write(str(obj))
+        return
+
+    if not isinstance(obj, ObjectBase):
+        fp.write(str(obj))
+        return
+
+    # mirror solid2.scad_render, which str(obj) uses
+    fp.write(get_include_string())
+    header = default_extension_manager.call_pre_render(obj)
+    if header:
+        fp.write(header + "\n\n")
+
+    root = default_extension_manager.wrap_root_node(obj)
+    subtrees = _Subtrees(
+        BareOpenSCADObject, ObjectBase, OpenSCADConstant, _ModifierBase
+    )
+    root_id = subtrees.add(root)
+    modules = subtrees.plan_modules(root_id, min_hoist_size) if hoist else {}
+    _SubtreeWriter(subtrees, modules, fp).write(root_id)
+
+    footer = default_extension_manager.call_post_render(root)
+    if footer:
+        fp.write(footer + "\n")
+
+
+class _Subtrees:
+    """Structurally unique subtrees of an object tree.
+
+    Each unique subtree gets an integer id. Its key is the node text and the
+    ids of its children, so identical subtrees hash to the same id wherever
+    they occur. Children always have smaller ids than their parents.
+    """
+
+    def __init__(self, bare_cls, base_cls, constant_cls, modifier_cls):
+        self._node_render = bare_cls._render
+        self._group_render = base_cls._render
+        self._constant_cls = constant_cls
+        self._modifier_cls = modifier_cls
+        self._modifier_prefixes: Dict[type, str] = {}
+
+        self.kinds: List[int] = []
+        self.texts: List[str] = []
+        self.children: List[Tuple[int, ...]] = []
+        self.sizes: List[int] = []
+        # subtree has a parameter with inline scad, e.g. a ScadValue variable
+        self.constants: List[bool] = []
+        # subtree is written as inline scad in its parent block, which may
+        # bind variables for its siblings, e.g. scad_inline("w = 3;")
+        self.inline: List[bool] = []
+        self._ids: Dict[tuple, int] = {}
+        self._memo: Dict[int, int] = {}
+
+    def add(self, node) -> int:
+        """Add the subtree rooted at node, returning its id"""
+        # identical python objects are often reused across a tree
+        memo_id = self._memo.get(id(node))
+        if memo_id is not None:
+            return memo_id
+
+        render = type(node)._render
+        modified = (
+            self.add(node._children[0])
+            if isinstance(node, self._modifier_cls) and len(node._children) == 1
+            else None
+        )
+        if modified is not None and self.kinds[modified] == _NODE:
+            # a modifier prefixes the head of the node it wraps, e.g. '#cube()'
+            kind = _NODE
+            text = self._modifier_prefix(type(node)) + self.texts[modified]
+            children = self.children[modified]
+            constant = self.constants[modified]
+        elif render is self._node_render:
+            kind = _NODE
+            text = node._generate_scad_head()
+            children = tuple(self.add(c) for c in node._children)
+            constant = self._has_constant(node._params)
+        elif render is self._group_render:
+            kind = _GROUP
+            text = ""
+            children = tuple(self.add(c) for c in node._children)
+            constant = False
+        else:
+            kind = _OPAQUE
+            text = node._render()
+            children = ()
+            constant = False
+
+        key = (kind, text, children)
+        subtree_id = self._ids.get(key)
+        if subtree_id is None:
+            subtree_id = len(self.kinds)
+            self._ids[key] = subtree_id
+            self.kinds.append(kind)
+            self.texts.append(text)
+            self.children.append(children)
+            self.sizes.append(1 + sum(self.sizes[c] for c in children))
+            self.constants.append(constant or any(self.constants[c] for c in children))
+            # groups are flattened into their parent block
+            self.inline.append(
+                isinstance(node, self._constant_cls)
+                or (kind == _GROUP and any(self.inline[c] for c in children))
+            )
+
+        self._memo[id(node)] = subtree_id
+        return subtree_id
+
+    def plan_modules(self, root_id: int, min_hoist_size: int) -> Dict[int, str]:
+        """Choose the subtrees to hoist, returning their module names"""
+        scoped = self._scoped(root_id)
+
+        # number of times each subtree is written given the hoisting so far,
+        # parents are visited before children because their ids are larger
+        uses = [0] * (root_id + 1)
+        uses[root_id] = 1
+        modules: Dict[int, str] = {}
+        for i in range(root_id, -1, -1):
+            if not uses[i]:
+                continue
+
+            if (
+                uses[i] > 1
+                and self.kinds[i] == _NODE
+                and self.sizes[i] >= min_hoist_size
+                and not self.constants[i]
+                and i not in scoped
+            ):
+                modules[i] = f"{MODULE_PREFIX}{len(modules)}"
+                body_uses = 1
+            else:
+                body_uses = uses[i]
+
+            for c in self.children[i]:
+                uses[c] += body_uses
+
+        return modules
+
+    def _modifier_prefix(self, modifier_type: type) -> str:
+        # a modifier without children renders as just its prefix
+        if modifier_type not in self._modifier_prefixes:
+            self._modifier_prefixes[modifier_type] = modifier_type()._render()
+        return self._modifier_prefixes[modifier_type]
+
+    def _binds_variables(self, i: int) -> bool:
+        name = self.texts[i].split("(")[0].lstrip("#%!*")
+        if self.kinds[i] == _NODE and name in SCOPE_NODES:
+            return True
+        return any(self.inline[c] for c in self.children[i])
+
+    def _has_constant(self, value) -> bool:
+        if isinstance(value, self._constant_cls):
+            return True
+        if isinstance(value, dict):
+            return any(self._has_constant(v) for v in value.values())
+        if isinstance(value, (list, tuple)):
+            return any(self._has_constant(v) for v in value)
+        return False
+
+    def _scoped(self, root_id: int) -> Set[int]:
+        """Ids of subtrees that occur below a node binding variables"""
+        scoped: Set[int] = set()
+        stack = [root_id]
+        visited = set(stack)
+        while stack:
+            i = stack.pop()
+            if self._binds_variables(i):
+                below = list(self.children[i])
+                while below:
+                    c = below.pop()
+                    if c not in scoped:
+                        scoped.add(c)
+                        below.extend(self.children[c])
+
+            for c in self.children[i]:
+                if c not in visited:
+                    visited.add(c)
+                    stack.append(c)
+        return scoped
+
+
+class _SubtreeWriter:
+    def __init__(self, subtrees: _Subtrees, modules: Dict[int, str], fp: IO[str]):
+        self.subtrees = subtrees
+        self.modules = modules
+        self.fp = fp
+
+    def write(self, root_id: int):
+        # nested subtrees have smaller ids, so their modules come first
+        for i, name in sorted(self.modules.items()):
+            self.fp.write(f"module {name}() {{\n")
+            self._write(i, 1, inline=True)
+            self.fp.write("}\n\n")
+
+        self._write(root_id, 0)
+
+    def _write(self, i: int, depth: int, inline: bool = False):
+        pad = "\t" * depth
+        if not inline and i in self.modules:
+            self.fp.write(f"{pad}{self.modules[i]}();\n")
+            return
+
+        kind = self.subtrees.kinds[i]
+        text = self.subtrees.texts[i]
+        children = self.subtrees.children[i]
+        if kind == _OPAQUE:
+            self.fp.write(textwrap.indent(text, pad))
+        elif kind == _GROUP:
+            for c in children:
+                self._write(c, depth)
+        elif children:
+            self.fp.write(f"{pad}{text} {{\n")
+            for c in children:
+                self._write(c, depth + 1)
+            self.fp.write(f"{pad}}}\n")
+        else:
+            self.fp.write(f"{pad}{text};\n")
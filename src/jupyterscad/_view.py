@@ -17,14 +17,16 @@ this program. If not, see <https://www.gnu.org/licenses/>.
 
 import math
 import tempfile
+from functools import cached_property
 from os import PathLike
-from typing import Optional, Union
+from typing import List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import pythreejs as pjs
 import stl
 
-from ._render import render_stl
+from ._bvh import BVH
+from ._render import RenderExecutor, render_stl
 from .exceptions import RenderError
 
 
@@ -35,6 +37,10 @@ def view(
     grid_unit: float = -1,
     outfile: Optional[Union[str, PathLike]] = None,
     openscad_exec: Optional[Union[str, PathLike]] = None,
+    measure: bool = False,
+    section: Optional[Tuple[Sequence[float], Sequence[float]]] = None,
+    executor: Optional[RenderExecutor] = None,
+    hoist: bool = True,
 ) -> pjs.Renderer:
     """View an OpenSCAD object.
 
@@ -49,6 +55,11 @@ def view(
         grid_unit: Grid cell size, 0 to disable, -1 for automatic.
         outfile: Name of stl file to generate. No stl file is generated if None.
         openscad_exec: Path to openscad executable.
+        measure: Enable double-click picking and point-to-point measurement.
+        section: Cross section plane to overlay, as (point on plane, normal).
+        executor: Executor that runs the render. Defaults to a LocalExecutor.
+        hoist: Write repeated subtrees of SolidPython2 objects once as OpenSCAD
+            modules. If False, the scad source is the same as str(obj).
 
     Returns:
         Rendering to be displayed.
@@ -58,15 +69,39 @@ def view(
     """
     try:
         if outfile:
-            render_stl(obj, outfile, openscad_exec=openscad_exec)
-            r = view_stl(outfile, width=width, height=height, grid_unit=grid_unit)
+            render_stl(
+                obj,
+                outfile,
+                openscad_exec=openscad_exec,
+                executor=executor,
+                hoist=hoist,
+            )
+            r = view_stl(
+                outfile,
+                width=width,
+                height=height,
+                grid_unit=grid_unit,
+                measure=measure,
+                section=section,
+            )
         else:
             with tempfile.NamedTemporaryFile(
                 suffix=".stl", delete=False
             ) as stl_tmp_file:
-                render_stl(obj, stl_tmp_file.name, openscad_exec=openscad_exec)
+                render_stl(
+                    obj,
+                    stl_tmp_file.name,
+                    openscad_exec=openscad_exec,
+                    executor=executor,
+                    hoist=hoist,
+                )
                 r = view_stl(
-                    stl_tmp_file.name, width=width, height=height, grid_unit=grid_unit
+                    stl_tmp_file.name,
+                    width=width,
+                    height=height,
+                    grid_unit=grid_unit,
+                    measure=measure,
+                    section=section,
                 )
         return r
     except RenderError as e:
@@ -78,6 +113,8 @@ def view_stl(
     width: int = 400,
     height: int = 400,
     grid_unit: float = -1,
+    measure: bool = False,
+    section: Optional[Tuple[Sequence[float], Sequence[float]]] = None,
 ) -> pjs.Renderer:
     """View a stl.
 
@@ -90,6 +127,8 @@ def view_stl(
         width: Visualization pixel width on page.
         height: Visualization pixel height on page.
         grid_unit: Grid cell size, 0 to disable, -1 for automatic
+        measure: Enable double-click picking and point-to-point measurement.
+        section: Cross section plane to overlay, as (point on plane, normal).
 
     Returns:
         Rendering to be displayed.
@@ -102,12 +141,32 @@ def view_stl(
         height=height,
         grid_unit=grid_unit,
     )
+    if section is not None:
+        v.add_cross_section(r.scene, *section)
+    if measure:
+        v.add_picker(r)
     return r
 
 
 class Visualizer:
     def __init__(self, stl_file):
         self.stl_mesh = stl.mesh.Mesh.from_file(stl_file)
+        self.picked_points: List[np.ndarray] = []
+        self.measurements: List[float] = []
+
+    @cached_property
+    def bvh(self) -> BVH:
+        """Spatial index over the mesh triangles, built on first use"""
+        return BVH(self.stl_mesh.vectors)
+
+    def pick(self, origin, direction) -> Optional[np.ndarray]:
+        """Closest point of the mesh hit by a ray, None if the ray misses"""
+        hit = self.bvh.intersect_ray(origin, direction)
+        return hit[2] if hit else None
+
+    def cross_section(self, origin, normal) -> np.ndarray:
+        """Line segments where a plane cuts the mesh, shape (k, 2, 3)"""
+        return self.bvh.cross_section(origin, normal)
 
     def create_mesh(self, color: str = "#ebcc34"):
         mesh = self.stl_mesh
@@ -209,3 +268,97 @@ class Visualizer:
         gh.rotateZ(math.pi / 2)
         gh.position = (0, grid_pos[1], grid_pos[2])
         scene.add(gh)
+
+    def add_point(self, scene, point, color="red"):
+        radius = max(self.stl_mesh.max_ - self.stl_mesh.min_) / 100
+        marker = pjs.Mesh(
+            geometry=pjs.SphereBufferGeometry(radius=radius),
+            material=pjs.MeshBasicMaterial(color=color),
+            position=np.asarray(point).tolist(),
+        )
+        scene.add(marker)
+        return marker
+
+    def add_measurement(self, scene, start, end, color="red") -> float:
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        distance = float(np.linalg.norm(end - start))
+        self.add_segments(scene, np.array([[start, end]]), color=color)
+        self.add_label(scene, f"{distance:.4g}", (start + end) / 2, color=color)
+        self.measurements.append(distance)
+        return distance
+
+    def add_label(self, scene, text, position, color="red"):
+        size = max(self.stl_mesh.max_ - self.stl_mesh.min_) / 10
+        label = pjs.Sprite(
+            material=pjs.SpriteMaterial(
+                map=pjs.TextTexture(string=text, color=color, size=100),
+                depthTest=False,
+            ),
+            position=np.asarray(position).tolist(),
+            scale=[size, size, 1],
+        )
+        scene.add(label)
+        return label
+
+    def add_cross_section(self, scene, origin, normal, color="blue"):
+        return self.add_segments(scene, self.cross_section(origin, normal), color)
+
+    def add_segments(self, scene, segments, color="red"):
+        # overlays are drawn on top of the model so they are not hidden by it
+        geometry = pjs.BufferGeometry(
+            attributes={
+                "position": pjs.BufferAttribute(
+                    array=np.asarray(segments, dtype=np.float32).reshape(-1, 3),
+                    normalized=False,
+                )
+            }
+        )
+        lines = pjs.LineSegments(
+            geometry=geometry,
+            material=pjs.LineBasicMaterial(color=color, depthTest=False),
+        )
+        scene.add(lines)
+        return lines
+
+    def add_picker(self, renderer, color="red"):
+        """Pick points on the model with a double click.
+
+        Client-side raycasting against the full model is slow for large
+        meshes, so the client only raycasts an invisible bounding box. The
+        camera position and the box hit define the pick ray, which is then
+        resolved against the model with the BVH. Every second picked point is
+        joined to the previous one by a measurement line labeled with the
+        distance, which is also appended to `measurements`.
+        """
+        # build the index now rather than stalling the first pick
+        self.bvh
+
+        min_ = self.stl_mesh.min_
+        max_ = self.stl_mesh.max_
+        box = pjs.Mesh(
+            geometry=pjs.BoxBufferGeometry(*(max_ - min_).tolist()),
+            material=pjs.MeshBasicMaterial(
+                transparent=True, opacity=0, depthWrite=False, side="DoubleSide"
+            ),
+            position=((min_ + max_) / 2).tolist(),
+        )
+        renderer.scene.add(box)
+        picker = pjs.Picker(controlling=box, event="dblclick")
+
+        def on_pick(change):
+            origin = np.array(renderer.camera.position)
+            point = self.pick(origin, np.array(change["new"]) - origin)
+            if point is None:
+                return
+
+            self.add_point(renderer.scene, point, color=color)
+            self.picked_points.append(point)
+            if len(self.picked_points) % 2 == 0:
+                self.add_measurement(
+                    renderer.scene, *self.picked_points[-2:], color=color
+                )
+
+        picker.observe(on_pick, names=["point"])
+        renderer.controls = renderer.controls + [picker]
+        return picker
@@ -26,6 +26,10 @@ class OpenSCADError(JupyterSCADError):
     pass
 
 
+class WorkerError(JupyterSCADError):
+    pass
+
+
 class RenderError(JupyterSCADError):
     def __init__(self, message: str, src: str) -> None:
         super().__init__(message)
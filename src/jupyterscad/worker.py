@@ -0,0 +1,187 @@
+"""
+Jupyter SCAD
+Copyright (C) 2023 Jennifer Reiber Kyle
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Reference render worker for `HTTPExecutor`.
+#
+# Start a worker on localhost with:
+#
+#     $ python -m jupyterscad.worker --port 8731
+#
+# and render with it from a notebook:
+#
+#     >>> view(cube(3), executor=HTTPExecutor('http://localhost:8731'))
+#
+# The worker accepts POST requests to /render with a JSON body
+# `{"jobs": [{"scad": <scad text>, "format": <output suffix>}, ...]}` and
+# responds with `{"results": [...]}`, one result per job, either
+# `{"data": <base64 mesh>}` or `{"error": {"type": ..., "message": ...}}`.
+#
+# The scad source is written to the worker's root directory, the working
+# directory unless set with --root, so relative paths in import(), use <> and
+# include <> resolve against it.
+#
+# The worker runs the scad text it receives, so only expose it to trusted clients.
+
+import argparse
+import base64
+import json
+import logging
+import re
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from pathlib import Path
+from typing import Optional, Union
+
+from ._render import LocalExecutor
+from .exceptions import OpenSCADError, RenderError
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8731
+
+# output formats are used as file suffixes, so only allow plain names
+FORMAT_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    openscad_exec: Optional[Union[str, PathLike]] = None,
+    root: Optional[Union[str, PathLike]] = None,
+) -> ThreadingHTTPServer:
+    """Create a worker server, call `serve_forever()` to start it.
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on, 0 for any free port.
+        openscad_exec: Path to openscad executable.
+        root: Directory relative paths in the scad source resolve against.
+            Defaults to the working directory.
+
+    Returns:
+        Worker server.
+    """
+    server = ThreadingHTTPServer((host, port), _RenderHandler)
+    server.executor = LocalExecutor(openscad_exec)  # type: ignore[attr-defined]
+    server.root = Path(root or ".").resolve()  # type: ignore[attr-defined]
+    return server
+
+
+def _check_jobs(body) -> list:
+    """Jobs of a request body, raising ValueError if the body is invalid"""
+    if not isinstance(body, dict) or not isinstance(body.get("jobs"), list):
+        raise ValueError('body must be an object with a "jobs" list')
+
+    for i, job in enumerate(body["jobs"]):
+        if not isinstance(job, dict) or not isinstance(job.get("scad"), str):
+            raise ValueError(f'job {i} must be an object with a "scad" string')
+        output_format = job.get("format", "stl")
+        if not isinstance(output_format, str) or not FORMAT_PATTERN.fullmatch(
+            output_format
+        ):
+            raise ValueError(f"job {i} has an invalid format")
+    return body["jobs"]
+
+
+def _render_job(executor: LocalExecutor, root: Path, job: dict) -> dict:
+    """Render one job, returning its result"""
+    with tempfile.TemporaryDirectory() as tmp_dir, tempfile.NamedTemporaryFile(
+        suffix=".scad", dir=root
+    ) as scad_tmp_file:
+        scad_file = scad_tmp_file.name
+        output_file = Path(tmp_dir) / f"model.{job.get('format', 'stl')}"
+        with open(scad_file, "w") as fp:
+            fp.write(job["scad"])
+
+        try:
+            executor.render(scad_file, output_file)
+            if not output_file.is_file():
+                raise OpenSCADError("OpenSCAD did not write an output file.")
+            data = output_file.read_bytes()
+        except RenderError as e:
+            return {
+                "error": {"type": "RenderError", "message": e.message, "src": e.src}
+            }
+        except OpenSCADError as e:
+            return {"error": {"type": "OpenSCADError", "message": str(e)}}
+        except Exception as e:
+            LOGGER.exception("Render failed")
+            return {"error": {"type": type(e).__name__, "message": repr(e)}}
+
+        return {"data": base64.b64encode(data).decode()}
+
+
+class _RenderHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/render":
+            self._respond(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            jobs = _check_jobs(json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            self._respond(400, {"error": f"Invalid request: {e}"})
+            return
+
+        results = [
+            _render_job(self.server.executor, self.server.root, job)  # type: ignore
+            for job in jobs
+        ]
+        self._respond(200, {"results": results})
+
+    def _respond(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        LOGGER.info(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jupyter SCAD render worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--openscad-exec", default=None)
+    parser.add_argument(
+        "--root",
+        default=None,
+        help="directory relative paths in the scad source resolve against",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.host, args.port, args.openscad_exec, args.root)
+    LOGGER.info(f"Serving on {args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Jupyter SCAD
+Copyright (C) 2023 Jennifer Reiber Kyle
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+import stl
+
+from jupyterscad import _bvh
+
+
+@pytest.fixture()
+def triangles(test_data):
+    return stl.mesh.Mesh.from_file(test_data("test.stl")).vectors
+
+
+def brute_force_ray(triangles, origin, direction):
+    t = _bvh._intersect_triangles(
+        np.asarray(origin, dtype=np.float64),
+        np.asarray(direction, dtype=np.float64),
+        np.asarray(triangles, dtype=np.float64),
+    )
+    return t.min()
+
+
+def test_BVH_build(triangles):
+    bvh = _bvh.BVH(triangles, leaf_size=4)
+
+    # every triangle is in exactly one leaf
+    assert sorted(bvh.order) == list(range(len(triangles)))
+    leaves = bvh.children[:, 0] < 0
+    assert bvh.count[leaves].sum() == len(triangles)
+    assert bvh.count[leaves].max() <= 4
+
+    # root bounds enclose the mesh
+    assert np.allclose(bvh.bounds_min[0], triangles.reshape(-1, 3).min(axis=0))
+    assert np.allclose(bvh.bounds_max[0], triangles.reshape(-1, 3).max(axis=0))
+
+
+# 18 triangles with leaf size 4 split into leaves and interior nodes that
+# alternate within a level
+@pytest.mark.parametrize("num_triangles,leaf_size", [(1, 8), (18, 4), (1000, 3)])
+def test_BVH_build_bounds(num_triangles, leaf_size):
+    rng = np.random.default_rng(0)
+    triangles = rng.random((num_triangles, 1, 3)) + rng.random((num_triangles, 3, 3))
+    bvh = _bvh.BVH(triangles, leaf_size=leaf_size)
+
+    assert sorted(bvh.order) == list(range(num_triangles))
+    for node, (left, right) in enumerate(bvh.children):
+        if left < 0:
+            # leaf bounds are the bounds of its triangles
+            tris = triangles[bvh._leaf_triangles(node)].reshape(-1, 3)
+            assert 0 < len(tris) <= 3 * leaf_size
+            assert np.allclose(bvh.bounds_min[node], tris.min(axis=0))
+            assert np.allclose(bvh.bounds_max[node], tris.max(axis=0))
+        else:
+            # interior bounds are the bounds of its children
+            assert np.allclose(
+                bvh.bounds_min[node], bvh.bounds_min[[left, right]].min(axis=0)
+            )
+            assert np.allclose(
+                bvh.bounds_max[node], bvh.bounds_max[[left, right]].max(axis=0)
+            )
+
+
+def test_BVH_intersect_ray_matches_brute_force(triangles):
+    bvh = _bvh.BVH(triangles)
+    center = triangles.reshape(-1, 3).mean(axis=0)
+
+    rng = np.random.default_rng(0)
+    for direction in rng.normal(size=(20, 3)):
+        origin = center - 1000 * direction
+        hit = bvh.intersect_ray(origin, direction)
+        expected = brute_force_ray(triangles, origin, direction)
+        if np.isinf(expected):
+            assert hit is None
+        else:
+            assert hit[0] == pytest.approx(expected)
+
+
+def test_BVH_intersect_ray_miss(triangles):
+    bvh = _bvh.BVH(triangles)
+    far = triangles.reshape(-1, 3).max(axis=0) + 10
+    assert bvh.intersect_ray(far, [1, 0, 0]) is None
+
+
+def test_BVH_cross_section_cube():
+    # unit cube as 12 triangles
+    corners = np.array(
+        [[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=float
+    )
+    faces = [
+        (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),  # x = 0, x = 1
+        (0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),  # y = 0, y = 1
+        (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),  # z = 0, z = 1
+    ]  # fmt: skip
+    bvh = _bvh.BVH(corners[np.array(faces)], leaf_size=2)
+
+    segments = bvh.cross_section([0, 0, 0.5], [0, 0, 1])
+
+    # 8 side triangles cut into a square of perimeter 4
+    assert segments.shape == (8, 2, 3)
+    assert np.allclose(segments[:, :, 2], 0.5)
+    lengths = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+    assert lengths.sum() == pytest.approx(4)
+
+
+def test_BVH_cross_section_miss(triangles):
+    bvh = _bvh.BVH(triangles)
+    far = triangles.reshape(-1, 3).max(axis=0) + 10
+    assert bvh.cross_section(far, [0, 0, 1]).shape == (0, 2, 3)
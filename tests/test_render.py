@@ -15,16 +15,21 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
+import http.client
+import json
 import logging
 import shutil
+import socket
 import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
 import solid2
 
-from jupyterscad import _render, exceptions, render_stl
+from jupyterscad import _render, exceptions, render_stl, render_stls, worker
 
 LOGGER = logging.getLogger(__name__)
 
@@ -54,6 +59,24 @@ def test_render_stl_str_obj(obj, tmp_path, monkeypatch):
     mock_process.assert_called_once()
 
 
+@pytest.mark.parametrize("hoist", [True, False])
+def test_render_stl_hoist(hoist, tmp_path, monkeypatch):
+    fastener = solid2.translate([0, 0, 1])(solid2.cylinder(r=1, h=5))
+    obj = solid2.union()(*[solid2.translate([i, 0, 0])(fastener) for i in range(3)])
+
+    def side_effect(scad_file, output_file, executable):
+        scad_str = Path(scad_file).read_text()
+        assert ("module" in scad_str) == hoist
+        if not hoist:
+            assert scad_str.rstrip("\n") == str(obj)
+
+    mock_process = Mock(side_effect=side_effect)
+    monkeypatch.setattr(_render, "process", mock_process)
+
+    render_stl(obj, tmp_path / "test.stl", hoist=hoist)
+    mock_process.assert_called_once()
+
+
 @pytest.mark.skip(
     "not a good test: floats as ints and precision depends on openscad version"
 )
@@ -141,3 +164,222 @@ def test_process_render_error(monkeypatch, tmp_path, output_file):
         _render.process(input_scad_file, output_file)
         assert e.message == out
         assert e.src == scad_str
+
+
+@pytest.fixture()
+def fake_process(monkeypatch):
+    """Replace OpenSCAD with writing the scad source to the output file"""
+
+    def side_effect(scad_file, output_file, executable=None):
+        scad_str = Path(scad_file).read_text()
+        if "invalid" in scad_str:
+            raise exceptions.RenderError(message="ERROR: invalid", src=scad_str)
+        Path(output_file).write_text(f"solid {scad_str}")
+
+    mock_process = Mock(side_effect=side_effect)
+    monkeypatch.setattr(_render, "process", mock_process)
+    return mock_process
+
+
+@pytest.fixture()
+def worker_url(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    server = worker.make_server(port=0, root=root)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_render_stls_local(fake_process, tmp_path):
+    outfiles = [tmp_path / "a.stl", tmp_path / "b.stl"]
+    render_stls(["cube(1);", "cube(2);"], outfiles)
+
+    assert fake_process.call_count == 2
+    assert outfiles[1].read_text() == "solid cube(2);"
+
+
+def test_render_stls_length_mismatch(tmp_path):
+    with pytest.raises(ValueError):
+        render_stls(["cube(1);"], [])
+
+
+def test_HTTPExecutor_render(fake_process, worker_url, tmp_path):
+    executor = _render.HTTPExecutor(worker_url)
+    output_file = tmp_path / "out.stl"
+
+    render_stl("cube(1);", output_file, executor=executor)
+    assert output_file.read_text() == "solid cube(1);"
+
+    # the connection is reused for the next render
+    conn = executor._conn
+    render_stl("cube(2);", output_file, executor=executor)
+    assert executor._conn is conn
+    assert output_file.read_text() == "solid cube(2);"
+    executor.close()
+
+
+def test_HTTPExecutor_render_many(fake_process, worker_url, tmp_path, monkeypatch):
+    executor = _render.HTTPExecutor(worker_url)
+    mock_request = Mock(wraps=executor._request)
+    monkeypatch.setattr(executor, "_request", mock_request)
+
+    outfiles = [tmp_path / f"{i}.stl" for i in range(3)]
+    render_stls([f"cube({i});" for i in range(3)], outfiles, executor=executor)
+
+    mock_request.assert_called_once()
+    assert [f.read_text() for f in outfiles] == [f"solid cube({i});" for i in range(3)]
+    executor.close()
+
+
+def test_HTTPExecutor_render_error(fake_process, worker_url, tmp_path):
+    executor = _render.HTTPExecutor(worker_url)
+    outfiles = [tmp_path / "a.stl", tmp_path / "b.stl"]
+
+    with pytest.raises(exceptions.RenderError) as e:
+        render_stls(["invalid;", "cube(1);"], outfiles, executor=executor)
+    assert e.value.src == "invalid;"
+
+    # successful renders in the batch are still written
+    assert outfiles[1].read_text() == "solid cube(1);"
+    executor.close()
+
+
+def test_HTTPExecutor_reconnect(fake_process, worker_url, tmp_path):
+    executor = _render.HTTPExecutor(worker_url)
+    output_file = tmp_path / "out.stl"
+
+    render_stl("cube(1);", output_file, executor=executor)
+    # simulate the worker dropping the kept-alive connection
+    executor._conn.sock.shutdown(socket.SHUT_RDWR)
+
+    render_stl("cube(2);", output_file, executor=executor)
+    assert output_file.read_text() == "solid cube(2);"
+    executor.close()
+
+
+def test_HTTPExecutor_no_worker(tmp_path):
+    server = worker.make_server(port=0)
+    port = server.server_port
+    server.server_close()
+
+    executor = _render.HTTPExecutor(f"http://127.0.0.1:{port}")
+    with pytest.raises(exceptions.WorkerError):
+        render_stl("cube(1);", tmp_path / "out.stl", executor=executor)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not json",
+        b'{"jobs": {}}',
+        b'{"jobs": ["cube(1);"]}',
+        b'{"jobs": [{"format": "stl"}]}',
+        b'{"jobs": [{"scad": "cube(1);", "format": "../stl"}]}',
+        b'{"jobs": [{"scad": "cube(1);", "format": null}]}',
+        b'{"jobs": [{"scad": "cube(1);", "format": 5}]}',
+    ],
+)
+def test_worker_bad_request(worker_url, body):
+    conn = http.client.HTTPConnection(worker_url.split("//")[1])
+    conn.request("POST", "/render", body)
+    resp = conn.getresponse()
+
+    assert resp.status == 400
+    assert "error" in json.loads(resp.read())
+    conn.close()
+
+
+def test_worker_job_exception(worker_url, tmp_path, monkeypatch):
+    # OpenSCAD exits without writing the output file
+    mock_process = Mock()
+    monkeypatch.setattr(_render, "process", mock_process)
+
+    executor = _render.HTTPExecutor(worker_url)
+    with pytest.raises(exceptions.OpenSCADError):
+        render_stl("cube(1);", tmp_path / "out.stl", executor=executor)
+
+    # any other failure is reported as a result and the job is not resent
+    mock_process.side_effect = KeyError("boom")
+    with pytest.raises(exceptions.OpenSCADError) as e:
+        render_stl("cube(1);", tmp_path / "out.stl", executor=executor)
+    assert "boom" in str(e.value)
+    assert mock_process.call_count == 2
+    executor.close()
+
+
+@pytest.fixture()
+def fake_worker_url():
+    """Worker that answers every request with the handler's canned reply"""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        reply = b""
+
+        def do_POST(self):
+            calls.append(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.reply is None:
+                # drop the connection without responding
+                self.close_connection = True
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(self.reply)))
+            self.end_headers()
+            self.wfile.write(self.reply)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", Handler, calls
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        b"not json",
+        b"{}",
+        b'{"results": [{"data": "c29saWQ="}]}',
+        b'{"results": [1, 2]}',
+    ],
+)
+def test_HTTPExecutor_invalid_response(fake_worker_url, tmp_path, reply):
+    url, handler, _ = fake_worker_url
+    handler.reply = reply
+
+    executor = _render.HTTPExecutor(url)
+    outfiles = [tmp_path / "a.stl", tmp_path / "b.stl"]
+    with pytest.raises(exceptions.WorkerError):
+        render_stls(["cube(1);", "cube(2);"], outfiles, executor=executor)
+    executor.close()
+
+
+def test_HTTPExecutor_no_retry_after_send(fake_worker_url, tmp_path):
+    url, handler, calls = fake_worker_url
+    handler.reply = None
+
+    executor = _render.HTTPExecutor(url)
+    with pytest.raises(exceptions.WorkerError):
+        render_stl("cube(1);", tmp_path / "out.stl", executor=executor)
+    assert len(calls) == 1
+
+
+def test_worker_relative_paths(worker_url, tmp_path, monkeypatch):
+    (tmp_path / "root" / "part.stl").write_text("solid part")
+
+    def side_effect(scad_file, output_file, executable=None):
+        # OpenSCAD resolves relative paths against the scad file directory
+        part = Path(scad_file).parent / "part.stl"
+        Path(output_file).write_text(part.read_text())
+
+    monkeypatch.setattr(_render, "process", Mock(side_effect=side_effect))
+
+    executor = _render.HTTPExecutor(worker_url)
+    output_file = tmp_path / "out.stl"
+    render_stl('import("part.stl");', output_file, executor=executor)
+    assert output_file.read_text() == "solid part"
+    executor.close()
@@ -0,0 +1,144 @@
+"""
+Jupyter SCAD
+Copyright (C) 2023 Jennifer Reiber Kyle
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+
+import pytest
+import solid2
+
+from jupyterscad import _serialize
+
+
+def to_scad(obj, **kwargs):
+    fp = io.StringIO()
+    _serialize.write_scad(obj, fp, **kwargs)
+    return fp.getvalue()
+
+
+def fastener():
+    return solid2.translate([0, 0, 1])(solid2.cylinder(r=1, h=5), solid2.sphere(2))
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        solid2.cube(3),
+        solid2.cube(3).debug(),
+        solid2.union()(fastener().debug(), solid2.cube(1).background().root()),
+        solid2.cube(1) + solid2.sphere(2) - solid2.cylinder(r=1, h=5),
+        solid2.union()(*[solid2.translate([i, 0, 0])(fastener()) for i in range(3)]),
+    ],
+)
+def test_write_scad_no_hoist_matches_str(obj):
+    assert to_scad(obj, hoist=False).rstrip("\n") == str(obj)
+
+
+def test_write_scad_str():
+    assert to_scad("cube(size = 3);") == "cube(size = 3);"
+
+
+def test_write_scad_hoist():
+    # distinct objects with identical structure
+    obj = solid2.union()(*[solid2.translate([i, 0, 0])(fastener()) for i in range(3)])
+    scad = to_scad(obj)
+
+    name = f"{_serialize.MODULE_PREFIX}0"
+    assert scad.count(f"module {name}()") == 1
+    assert scad.count(f"{name}();") == 3
+    assert scad.count("cylinder(h = 5, r = 1);") == 1
+    assert f"{_serialize.MODULE_PREFIX}1" not in scad
+
+
+def test_write_scad_hoist_outermost():
+    # only the repeated outer subtree is hoisted, not its repeated children
+    obj = solid2.union()(fastener().rotate(10), fastener().rotate(10))
+    scad = to_scad(obj)
+
+    assert scad.count("module ") == 1
+    assert scad.count("rotate(a = 10)") == 1
+
+
+def test_write_scad_hoist_min_size():
+    obj = solid2.union()(solid2.cube(1), solid2.cube(1))
+    assert "module" not in to_scad(obj)
+
+
+def test_write_scad_no_hoist_in_scope():
+    obj = solid2.union()(
+        solid2.intersection_for(3)(fastener()),
+        solid2.intersection_for(4)(fastener()),
+    )
+    assert "module" not in to_scad(obj)
+
+
+def test_write_scad_no_hoist_inline_variable():
+    # w is local to the union block, so it is undefined inside a module
+    obj = solid2.union()(
+        solid2.scad_inline("w = 3;"),
+        solid2.translate([1, 0, 0])(solid2.cube(2)),
+        solid2.translate([1, 0, 0])(solid2.cube(2)),
+    )
+    assert "module" not in to_scad(obj)
+
+
+def test_write_scad_no_hoist_scad_value():
+    obj = solid2.union()(
+        solid2.translate([1, 0, 0])(solid2.cube(solid2.ScadValue("w"))),
+        solid2.translate([1, 0, 0])(solid2.cube([solid2.ScadValue("w"), 1, 1])),
+        solid2.translate([1, 0, 0])(solid2.cube([solid2.ScadValue("w"), 1, 1])),
+    )
+    assert "module" not in to_scad(obj)
+
+
+def test_write_scad_hoist_block_with_inline_variable():
+    # a repeated block that binds its own variable can still be hoisted whole
+    def block():
+        return solid2.union()(
+            solid2.scad_inline("w = 3;"), solid2.translate([1, 0, 0])(fastener())
+        )
+
+    scad = to_scad(solid2.union()(block().rotate(10), block().rotate(20)))
+    assert scad.count("module ") == 1
+    assert scad.count("w = 3;") == 1
+
+
+def test_write_scad_hoist_next_to_modifier():
+    # a modifier sibling does not bind variables, so hoisting is unaffected
+    obj = solid2.union()(
+        *[solid2.translate([i, 0, 0])(fastener()) for i in range(3)],
+        solid2.cube(1).debug(),
+    )
+    scad = to_scad(obj)
+
+    assert scad.count("module ") == 1
+    assert scad.count("#cube(size = 1);") == 1
+
+
+def test_write_scad_hoist_below_modifier():
+    # subtrees below a modifier are hashed and hoisted too
+    obj = solid2.union()(
+        solid2.union()(fastener(), fastener().rotate(10)).background(),
+        fastener().debug(),
+        fastener().debug(),
+    )
+    scad = to_scad(obj)
+
+    # one module for the plain fastener, one for the highlighted fastener
+    assert scad.count("module ") == 2
+    assert scad.count("cylinder(h = 5, r = 1);") == 2
+    assert scad.count("#translate(v = [0, 0, 1])") == 1
+    assert "%union()" in scad
@@ -34,6 +34,15 @@ def test_view_success(monkeypatch):
     mock_view_stl.assert_called_once()
 
 
+def test_view_hoist(monkeypatch):
+    mock_render_stl = Mock()
+    monkeypatch.setattr(_view, "view_stl", Mock())
+    monkeypatch.setattr(_view, "render_stl", mock_render_stl)
+
+    view(solid2.cube(3), hoist=False)
+    assert mock_render_stl.call_args.kwargs["hoist"] is False
+
+
 def test_Visualizer_create_renderer(test_data):
     v = _view.Visualizer(test_data("test.stl"))
     v.create_renderer(v.create_mesh(), v.create_camera())
@@ -41,3 +50,60 @@ def test_Visualizer_create_renderer(test_data):
 
 def test_view_stl_success(test_data):
     view_stl(test_data("test.stl"))
+
+
+def test_Visualizer_pick(test_data):
+    v = _view.Visualizer(test_data("test.stl"))
+    center = (v.stl_mesh.min_ + v.stl_mesh.max_) / 2
+    origin = center + [0, 0, 1000]
+
+    # straight down onto the flat top of the model
+    point = v.pick(origin, [0, 0, -1])
+    assert point[2] == pytest.approx(v.stl_mesh.max_[2])
+    assert point[:2] == pytest.approx(origin[:2])
+
+
+def test_Visualizer_overlays(test_data):
+    v = _view.Visualizer(test_data("test.stl"))
+    r = v.create_renderer(v.create_mesh(), v.create_camera())
+    num_children = len(r.scene.children)
+
+    center = (v.stl_mesh.min_ + v.stl_mesh.max_) / 2
+    v.add_cross_section(r.scene, center, [0, 0, 1])
+    assert v.add_measurement(r.scene, [0, 0, 0], [3, 4, 0]) == 5
+    assert v.measurements == [5]
+
+    # section lines, measurement line and distance label
+    assert len(r.scene.children) == num_children + 3
+    assert isinstance(r.scene.children[-1], _view.pjs.Sprite)
+    assert r.scene.children[-1].material.map.string == "5"
+
+
+def test_Visualizer_add_picker(test_data):
+    v = _view.Visualizer(test_data("test.stl"))
+    r = v.create_renderer(v.create_mesh(), v.create_camera())
+    picker = v.add_picker(r)
+
+    assert isinstance(r.controls[-1], _view.pjs.Picker)
+    assert "bvh" in vars(v)
+
+    # pick two points on the top of the model, straight down from the camera
+    top = v.stl_mesh.max_[2]
+    for x in (0, 3):
+        r.camera.position = (x, 2.5, 1000)
+        picker.point = (x, 2.5, top + 1)
+
+    assert len(v.picked_points) == 2
+    assert v.measurements == [pytest.approx(3)]
+    assert isinstance(r.scene.children[-1], _view.pjs.Sprite)
+
+
+def test_view_stl_measure(test_data):
+    r = view_stl(test_data("test.stl"), measure=True)
+    assert isinstance(r.controls[-1], _view.pjs.Picker)
+
+
+def test_view_stl_section(test_data):
+    r = view_stl(test_data("test.stl"), section=([0, 0, 1], [0, 0, 1]))
+    lines = [c for c in r.scene.children if isinstance(c, _view.pjs.LineSegments)]
+    assert len(lines) == 1